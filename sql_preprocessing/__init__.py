@@ -1,3 +1,4 @@
 from .sp import *
 from .idax import *
-from .sp_validation import *
\ No newline at end of file
+from .sp_validation import *
+from .dialect import *
\ No newline at end of file
@@ -0,0 +1,833 @@
+"""SQL Dialects
+This module contains the dialects used by :class:`SqlConnection` and :class:`SqlDataFrame`
+to generate the DBMS specific parts of SQL statements - row limits, CREATE TABLE AS, catalog queries,
+identity columns, random sampling and splits, fit tables of encoders.
+
+The dialect of a connection is selected from the connection string (see :class:`SqlConnection`)
+or can be provided explicitly, so a new DBMS can be supported by a subclass of :class:`SqlDialect`.
+
+Notes
+-----
+SQLite does not have schemas, each schema used by the library is attached as a separate database
+(see :meth:`SqliteDialect.prepare_schema`).
+
+"""
+
+
+import sqlalchemy
+import sqlalchemy.pool
+import sqlite3
+import hashlib
+import json
+import decimal
+import math
+import os
+import threading
+
+
+
+
+# Class: SqlDialect
+# Standard SQL dialect (PostgreSQL), the base for all dialects
+class SqlDialect:
+
+    name = "PostgreSQL"
+
+    # the maximum number of bind parameters in a single statement
+    max_bind_parameters = 30000
+
+    # DROP TABLE IF EXISTS, and DROP TABLE of several tables in a single statement
+    supports_drop_if_exists = True
+    supports_multi_table_drop = True
+
+    # tables not written to the write-ahead log, used for intermediate results which can be recomputed
+    supports_unlogged_tables = True
+
+    # CROSS JOIN LATERAL of a subquery referring to the columns of the preceding tables
+    supports_lateral_join = True
+
+    # TABLESAMPLE BERNOULLI / SYSTEM with REPEATABLE seed
+    supports_tablesample = True
+
+    # INSERT in the WITH clause of another INSERT, both tables can be filled by a single scan of the source
+    supports_insert_cte = True
+
+
+    def __repr__(self):
+        return "%s(name=%s)" % (type(self).__name__, self.name)
+
+
+    def create_engine(self, connection_string, pool_size = None):
+        """Returns sqlalchemy.engine.Engine for the connection string.
+        If the pool size is provided, the engine keeps at most pool_size connections.
+        """
+
+        if (pool_size is None):
+            engine = sqlalchemy.create_engine(connection_string)
+        else:
+            engine = sqlalchemy.create_engine(connection_string, pool_size = pool_size, max_overflow = 0)
+
+        sqlalchemy.event.listen(engine, "connect", self.on_connect)
+
+        return engine
+
+
+    def on_connect(self, dbapi_connection, connection_record):
+        # called for each new DBAPI connection of the engine
+        pass
+
+
+    def prepare_schema(self, dbconn, schema):
+        # called before a schema is used by the library, the standard dialect expects the schema to exist
+        pass
+
+
+    def is_copy_supported(self, engine):
+        # binary COPY is used for bulk load and columnar fetch
+        return (engine.dialect.driver == "psycopg2")
+
+
+    def is_prepared_statement_supported(self, engine):
+        return (engine.dialect.driver == "psycopg2")
+
+
+    def get_limit_sql(self, limit):
+        return "\nLIMIT " + str(limit) if (limit is not None) else ""
+
+
+    def get_random_sql(self, random_state, key_column = None):
+        # the seed is set by get_seed_sql
+        return "random()"
+
+
+    def get_seed_sql(self, random_state):
+        # statement setting the seed of the random number generator, it precedes the statement using get_random_sql
+        return "SELECT setseed(" + str(random_state) + ");\n"
+
+
+    def get_hash_sql(self, column, random_state):
+        # deterministic number in [0, 1) computed from the value of the column (integer or string) and the seed
+        # the first 32 bits of MD5 of "seed:value", the same function is registered in SQLite (see SqliteDialect.hash)
+        sql = "MD5('" + str(int(random_state)) + ":' || CAST(" + column + " AS TEXT))"
+        return "(CAST(CAST(('x' || SUBSTR(" + sql + ", 1, 8)) AS BIT(32)) AS BIGINT) / 4294967296.0)"
+
+
+    def get_tablesample_sql(self, table, method, percent, random_state):
+        # method is BERNOULLI (sample of rows) or SYSTEM (sample of blocks)
+        return table + " TABLESAMPLE " + method + " (" + str(percent) + ") REPEATABLE (" + str(int(random_state)) + ")"
+
+
+    def get_create_table_as_sql(self, schema, table, sql, unlogged = False):
+        unlogged_sql = "UNLOGGED " if (unlogged and self.supports_unlogged_tables) else ""
+        return "CREATE " + unlogged_sql + "TABLE " + schema + "." + table + " AS\n" + sql
+
+
+    def get_analyze_sql(self, schema, table):
+        # statement refreshing the optimizer statistics of the table, None if there is no such statement
+        return "ANALYZE " + schema + "." + table
+
+
+    def get_estimated_cost(self, dbconn, sql):
+        # (cost, rows) of the statement estimated by the optimizer, None if the estimate is not available
+        row = dbconn.execute_query_onerow("EXPLAIN (FORMAT JSON) " + sql)
+        if (row is None):
+            return None
+
+        plan = json.loads(row[0]) if (isinstance(row[0], str)) else row[0]
+        plan = plan[0]["Plan"]
+
+        return (plan["Total Cost"], plan["Plan Rows"])
+
+
+    def get_approximate_row_count(self, dbconn, schema, table):
+        # number of rows of the table from the optimizer statistics, None if the table was not analyzed
+        sql = "SELECT c.reltuples FROM pg_class c INNER JOIN pg_namespace n ON n.oid = c.relnamespace"
+        sql += " WHERE UPPER(n.nspname) = UPPER('" + schema + "') AND UPPER(c.relname) = UPPER('" + table + "')"
+        row = dbconn.execute_query_onerow(sql)
+
+        # reltuples is -1 (0 before PostgreSQL 14) if the table was never analyzed or vacuumed
+        return int(row[0]) if (row is not None and row[0] is not None and row[0] > 0) else None
+
+
+    def get_table_options_sql(self, options, kind):
+        # additional clause of CREATE TABLE for catalog and fit tables (such as tablespace), kind is "catalog" or "fit"
+        return ""
+
+
+    def get_table_exists_sql(self, schema, table):
+        return "SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE UPPER(TABLE_NAME) = UPPER('" + table + "') AND UPPER(TABLE_SCHEMA) = UPPER('" + schema + "')"
+
+
+    def get_column_exists_sql(self, schema, table, column):
+        return "SELECT * FROM INFORMATION_SCHEMA.COLUMNS WHERE UPPER(TABLE_NAME) = UPPER('" + table + "') AND UPPER(TABLE_SCHEMA) = UPPER('" + schema + "') AND UPPER(COLUMN_NAME) = UPPER('" + column + "')"
+
+
+    def get_table_schema_sql(self, schema, table):
+        return "SELECT * FROM INFORMATION_SCHEMA.COLUMNS WHERE UPPER(TABLE_NAME) = UPPER('" + table + "') AND UPPER(TABLE_SCHEMA) = UPPER('" + schema + "') ORDER BY ORDINAL_POSITION"
+
+
+    def get_existing_tables_sql(self, tables):
+        # selects (schema, table) of the tables from the list which exist
+        conditions = ["(UPPER(TABLE_SCHEMA) = UPPER('" + schema + "') AND UPPER(TABLE_NAME) = UPPER('" + table + "'))" for schema, table in tables]
+        return "SELECT TABLE_SCHEMA, TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE " + "\n OR ".join(conditions)
+
+
+    def get_drop_tables_sql(self, tables):
+        # returns list of statements dropping the tables (schema, table), without IF EXISTS the tables must exist
+        names = [schema + "." + table for schema, table in tables]
+        if_exists_sql = "IF EXISTS " if (self.supports_drop_if_exists) else ""
+
+        if (self.supports_multi_table_drop):
+            return ["DROP TABLE " + if_exists_sql + ", ".join(names)]
+
+        return ["DROP TABLE " + if_exists_sql + name for name in names]
+
+
+    def get_existing_views_sql(self, views):
+        # selects (schema, view) of the views from the list which exist, tables are not selected
+        conditions = ["(UPPER(TABLE_SCHEMA) = UPPER('" + schema + "') AND UPPER(TABLE_NAME) = UPPER('" + view + "'))" for schema, view in views]
+        return "SELECT TABLE_SCHEMA, TABLE_NAME FROM INFORMATION_SCHEMA.VIEWS WHERE " + "\n OR ".join(conditions)
+
+
+    def get_drop_views_sql(self, views):
+        # returns list of statements dropping the views (schema, view), the views must exist
+        names = [schema + "." + view for schema, view in views]
+
+        if (self.supports_multi_table_drop):
+            return ["DROP VIEW " + ", ".join(names)]
+
+        return ["DROP VIEW " + name for name in names]
+
+
+    def get_create_view_sql(self, schema, view, sql):
+        return "CREATE VIEW " + schema + "." + view + " AS\n" + sql
+
+
+    def get_add_identity_column_sql(self, schema, table, column):
+        # returns list of statements
+        return ["ALTER TABLE " + schema + "." + table + " ADD COLUMN " + column + " INT GENERATED ALWAYS AS IDENTITY"]
+
+
+    def get_create_unique_index_sql(self, schema, table, column, index):
+        return "CREATE UNIQUE INDEX " + index + " ON " + schema + "." + table + "(" + column + ")"
+
+
+    def get_add_primary_key_sql(self, schema, table, column, constraint):
+        return "ALTER TABLE " + schema + "." + table + " ADD CONSTRAINT " + constraint + " PRIMARY KEY (" + column + ")"
+
+
+    def get_bind_parameter_sql(self, name, value):
+        return ":" + name
+
+
+    def get_sample_sql(self, sdf, n, frac, random_state):
+
+        if (frac != 0):
+            limit = "(SELECT count(*) * " + str(frac) + " FROM " + sdf.sdf_query_data_source + ")"
+        else:
+            limit = n
+
+        sql = sdf.generate_sql(limit = limit, order_by = self.get_random_sql(random_state, sdf.key_column))
+        return self.get_seed_sql(random_state) + sql
+
+
+    def get_train_test_split_sql(self, sdf, test_size, random_state, test_table, train_table):
+        # returns list of (table, sql), both subsets must be generated with the same order of rows
+
+        source = sdf.sdf_query_data_source
+        order_by = self.get_random_sql(random_state, sdf.key_column)
+
+        # create table for test subset
+        sql = self.get_seed_sql(random_state)
+        sql += "SELECT * INTO " + sdf.fit_schema + "." + test_table + "\nFROM " + source + "\nORDER BY " + order_by + " LIMIT "
+        sql += "(SELECT count(*) * " + str(test_size) + " FROM " + source + ")"
+        test_sql = sql
+
+        # create table for train subset
+        sql = self.get_seed_sql(random_state)
+        sql += "SELECT * INTO " + sdf.fit_schema + "." + train_table + "\nFROM " + source + "\nORDER BY " + order_by + " LIMIT "
+        sql += "ALL OFFSET (SELECT count(*) * " + str(test_size) + " FROM " + source + ")"
+
+        return [(test_table, test_sql), (train_table, sql)]
+
+
+    def get_hash_split_sql(self, sdf, test_size, random_state, test_table, train_table, view = False):
+        # returns list of statements creating the test and train subsets, the rows are assigned by the hash of the key column
+        # there is no sort and no count, the size of the subsets is approximate
+
+        source = sdf.sdf_query_data_source
+        test_condition = self.get_hash_sql("data_table." + sdf.key_column, random_state) + " < " + str(test_size)
+        test_sql = "SELECT * FROM " + source + " AS data_table WHERE " + test_condition
+        train_sql = "SELECT * FROM " + source + " AS data_table WHERE NOT (" + test_condition + ")"
+
+        if (view):
+            return [self.get_create_view_sql(sdf.fit_schema, test_table, test_sql), self.get_create_view_sql(sdf.fit_schema, train_table, train_sql)]
+
+        if (not self.supports_insert_cte):
+            return [self.get_create_table_as_sql(sdf.fit_schema, test_table, test_sql), self.get_create_table_as_sql(sdf.fit_schema, train_table, train_sql)]
+
+        # empty tables are filled by a single statement, the source referenced twice is materialized once
+        sqls = [self.get_create_table_as_sql(sdf.fit_schema, table, "SELECT * FROM " + source + " AS data_table WHERE 1 = 0") for table in (test_table, train_table)]
+
+        sql = "WITH data_table AS (SELECT * FROM " + source + "),"
+        sql += "\ntest_rows AS (INSERT INTO " + sdf.fit_schema + "." + test_table + " SELECT * FROM data_table WHERE " + test_condition + ")"
+        sql += "\nINSERT INTO " + sdf.fit_schema + "." + train_table + " SELECT * FROM data_table WHERE NOT (" + test_condition + ")"
+
+        return sqls + [sql]
+
+
+    def get_label_encoder_fit_sql(self, sdf, fit_table, column, options):
+        # returns list of statements creating the fit table (label_key, label_encoded) with primary key on label_key
+
+        sql = "SELECT label_key, (ROW_NUMBER () OVER (ORDER BY label_key)) - 1 AS label_encoded"
+        sql += "\nINTO " + sdf.fit_schema + "." + fit_table + "\nFROM (SELECT DISTINCT " + column + " AS label_key FROM " + sdf.sdf_query_data_source + " AS data_table ) AS table_input"
+
+        return [sql, self.get_add_primary_key_sql(sdf.fit_schema, fit_table, "label_key", fit_table.replace(".", "_") + "_key")]
+
+
+    def get_data_fingerprint(self, dbconn, schema, table):
+        # modification indicators of the table, used by SqlFitCache, None if they are not available
+
+        # the indicators are read from the catalog, the table is not scanned
+        # the relation changes when the table is recreated or truncated, the statistics counters change with every insert, update and delete
+        # views have no statistics
+        sql = "SELECT c.oid, c.relfilenode, s.n_tup_ins, s.n_tup_upd, s.n_tup_del FROM pg_class c INNER JOIN pg_namespace n ON n.oid = c.relnamespace"
+        sql += " INNER JOIN pg_stat_user_tables s ON s.relid = c.oid"
+        sql += " WHERE UPPER(n.nspname) = UPPER('" + schema + "') AND UPPER(c.relname) = UPPER('" + table + "')"
+        row = dbconn.execute_query_onerow(sql)
+
+        if (row is None):
+            return None
+
+        return ["relation", (row[0], row[1]), "modification", (row[2], row[3], row[4])]
+
+# end of class SqlDialect
+
+
+
+
+
+
+# Class: Db2Dialect
+# DB2 (z and LUW)
+# DB2 INFORMATION_SCHEMA
+# https://www.ibm.com/support/knowledgecenter/en/SSAE4W_9.5.1/db2/rbafzcatalog.htm
+class Db2Dialect(SqlDialect):
+
+    name = "DB2"
+
+    # DB2 for z/OS does not support IF EXISTS, existing tables are selected from the catalog before drop
+    supports_drop_if_exists = False
+    supports_multi_table_drop = False
+
+    supports_unlogged_tables = False
+
+    # LATERAL is not available on all platforms and versions
+    supports_lateral_join = False
+
+    supports_insert_cte = False
+
+    # HASH_MD5 is available since Db2 11.1, for older versions set to False on the dialect instance (see get_hash_sql)
+    supports_hash_md5 = True
+
+
+    def is_copy_supported(self, engine):
+        return False
+
+
+    def is_prepared_statement_supported(self, engine):
+        return False
+
+
+    def get_limit_sql(self, limit):
+        return "\nFETCH FIRST " + str(limit) + " ROWS ONLY" if (limit is not None) else ""
+
+
+    def get_random_sql(self, random_state, key_column = None):
+        return "RAND(" + str(random_state) + ")"
+
+
+    def get_seed_sql(self, random_state):
+        # the seed is the argument of RAND
+        return ""
+
+
+    def get_hash_sql(self, column, random_state):
+        # same as SqlDialect.get_hash_sql, the first 32 bits of MD5 of "seed:value" converted from the hex digits (BIGINT, the value exceeds INTEGER)
+        # without HASH_MD5 the multiplicative hash of numeric values is used, it selects different rows than the other DBMS and fails for character values
+        if (not self.supports_hash_md5):
+            return "(CAST(MOD((CAST(" + column + " AS DECIMAL(31, 0)) + " + str(int(random_state)) + ") * 2654435761, 4294967296) AS DOUBLE) / 4294967296)"
+
+        hex_sql = "HEX(HASH_MD5('" + str(int(random_state)) + ":' || CAST(" + column + " AS VARCHAR(254))))"
+        digits_sql = ["(CAST(LOCATE(SUBSTR(" + hex_sql + ", " + str(i + 1) + ", 1), '0123456789ABCDEF') AS BIGINT) - 1) * " + str(16 ** (7 - i)) for i in range(8)]
+
+        return "(CAST(" + " + ".join(digits_sql) + " AS DOUBLE) / 4294967296)"
+
+
+    def get_create_table_as_sql(self, schema, table, sql, unlogged = False):
+        return "CREATE TABLE " + schema + "." + table + " AS\n(" + sql + ") WITH DATA"
+
+
+    def get_analyze_sql(self, schema, table):
+        # RUNSTATS is a utility, not a SQL statement
+        return None
+
+
+    def get_estimated_cost(self, dbconn, sql):
+        # the estimate requires the explain tables
+        return None
+
+
+    def get_approximate_row_count(self, dbconn, schema, table):
+        # CARD is -1 if RUNSTATS was not run on the table
+        row = dbconn.execute_query_onerow("SELECT CARD FROM SYSCAT.TABLES WHERE UPPER(TABNAME)=UPPER('" + table + "') AND UPPER(TABSCHEMA)=UPPER('" + schema + "')")
+        return int(row[0]) if (row is not None and row[0] is not None and row[0] >= 0) else None
+
+
+    def get_table_options_sql(self, options, kind):
+        # create catalog or fit table in specific database or tablespace
+        return options.get("db2_create_" + kind + "_table_in", "")
+
+
+    def get_table_exists_sql(self, schema, table):
+        return "SELECT * FROM SYSIBM.SYSTABLES WHERE UPPER(NAME)=UPPER('" + table + "') AND UPPER(CREATOR)=UPPER('" + schema + "')"
+
+
+    def get_column_exists_sql(self, schema, table, column):
+        return "SELECT * FROM SYSIBM.SYSCOLUMNS WHERE UPPER(NAME)=UPPER('" + column + "') AND UPPER(TBNAME)=UPPER('" + table + "') AND UPPER(TBCREATOR)=UPPER('" + schema + "')"
+
+
+    def get_table_schema_sql(self, schema, table):
+        return "SELECT * FROM SYSIBM.SYSCOLUMNS WHERE TBNAME='" + table + "' AND TBCREATOR='" + schema + "'"
+
+
+    def get_existing_tables_sql(self, tables):
+        conditions = ["(UPPER(CREATOR)=UPPER('" + schema + "') AND UPPER(NAME)=UPPER('" + table + "'))" for schema, table in tables]
+        return "SELECT CREATOR, NAME FROM SYSIBM.SYSTABLES WHERE " + "\n OR ".join(conditions)
+
+
+    def get_existing_views_sql(self, views):
+        conditions = ["(UPPER(CREATOR)=UPPER('" + schema + "') AND UPPER(NAME)=UPPER('" + view + "'))" for schema, view in views]
+        return "SELECT CREATOR, NAME FROM SYSIBM.SYSTABLES WHERE TYPE = 'V' AND (" + "\n OR ".join(conditions) + ")"
+
+
+    def get_add_identity_column_sql(self, schema, table, column):
+        return ["ALTER TABLE " + schema + "." + table + " ADD COLUMN " + column + " INT GENERATED ALWAYS AS IDENTITY (START WITH 1, INCREMENT BY 1)"]
+
+
+    def get_bind_parameter_sql(self, name, value):
+
+        # DB2 does not infer the type of untyped parameter markers in expressions
+        if (isinstance(value, (int, float, decimal.Decimal)) and not isinstance(value, bool)):
+            return "CAST(:" + name + " AS DOUBLE)"
+
+        return ":" + name
+
+
+    def get_sample_sql(self, sdf, n, frac, random_state):
+
+        # get n if fraction is used
+        if (frac != 0):
+            n = int(sdf.get_table_size() * frac)
+
+        return sdf.generate_sql(limit = n, order_by = self.get_random_sql(random_state))
+
+
+    def get_train_test_split_sql(self, sdf, test_size, random_state, test_table, train_table):
+
+        row_count = sdf.get_table_size()
+        test_count = int(row_count * test_size)
+        train_count = row_count - test_count
+
+        source = sdf.sdf_query_data_source
+        order_by = self.get_random_sql(random_state)
+
+        # create table for test subset
+        sql = "SELECT * FROM " + source + "\nORDER BY " + order_by + " LIMIT " + str(test_count)
+        test_sql = self.get_create_table_as_sql(sdf.fit_schema, test_table, sql)
+
+        # create table for train subset
+        sql = "SELECT * FROM " + source + "\nORDER BY " + order_by + " LIMIT " + str(train_count) + " OFFSET " + str(test_count)
+        train_sql = self.get_create_table_as_sql(sdf.fit_schema, train_table, sql)
+
+        return [(test_table, test_sql), (train_table, train_sql)]
+
+
+    # for now - converts all values to string for simplicity
+    def get_label_encoder_fit_sql(self, sdf, fit_table, column, options):
+
+        # create new table
+        sql = "CREATE TABLE " + sdf.fit_schema + "." + fit_table + " (label_key VARCHAR(255) NOT NULL, label_encoded INT, PRIMARY KEY (label_key)) "
+        sql += " " + self.get_table_options_sql(options, "fit")
+        create_sql = sql
+
+        # generate labels
+        sql = "INSERT INTO " + sdf.fit_schema + "." + fit_table + "(label_key, label_encoded)"
+        sql += "\nSELECT label_key, (ROW_NUMBER () OVER (ORDER BY label_key)) - 1 AS label_encoded"
+        sql += "\nFROM (SELECT DISTINCT " + column + " AS label_key FROM " + sdf.sdf_query_data_source + " AS data_table ) AS table_input"
+
+        return [create_sql, sql]
+
+
+    def get_data_fingerprint(self, dbconn, schema, table):
+
+        row = dbconn.execute_query_onerow("SELECT COUNT(*) FROM " + schema + "." + table)
+        fingerprint = ["count", row[0] if (row is not None) else None]
+
+        sql = "SELECT ALTEREDTS FROM SYSIBM.SYSTABLES WHERE UPPER(NAME)=UPPER('" + table + "') AND UPPER(CREATOR)=UPPER('" + schema + "')"
+        row = dbconn.execute_query_onerow(sql)
+        fingerprint += ["modification", tuple(row) if (row is not None) else None]
+
+        return fingerprint
+
+# end of class Db2Dialect
+
+
+
+
+
+
+# Class: SqliteDialect
+# In-process SQLite database (sqlite:///path/db.sqlite or sqlite://)
+#
+# Each schema is attached as a separate database - path/db_<schema>.sqlite next to the main database file,
+# or an in-memory database if the main database is in memory.
+# The aggregates and functions missing in SQLite (STDDEV, VARIANCE, SQRT, ...) are registered on each connection.
+# The random order is a hash of the key column and the seed, so samples and splits are repeatable.
+class SqliteDialect(SqlDialect):
+
+    name = "SQLite"
+
+    # SQLITE_MAX_VARIABLE_NUMBER defaults to 32766 since 3.32.0
+    max_bind_parameters = 32766 if (sqlite3.sqlite_version_info >= (3, 32, 0)) else 999
+
+    supports_multi_table_drop = False
+
+    supports_unlogged_tables = False
+    supports_lateral_join = False
+    supports_tablesample = False
+    supports_insert_cte = False
+
+
+    def __init__(self):
+        # attached schemas - lower case name: path of the database file
+        self.schemas = {}
+        self.database = None
+        self.lock = threading.Lock()
+
+
+    def create_engine(self, connection_string, pool_size = None):
+        url = sqlalchemy.engine.make_url(connection_string)
+        self.database = url.database if (url.database not in ("", ":memory:")) else None
+
+        # connections are shared by threads in pooled mode
+        connect_args = {"check_same_thread": False}
+
+        if (self.database is None):
+            # all connections must see the same in-memory database
+            engine = sqlalchemy.create_engine(connection_string, connect_args = connect_args, poolclass = sqlalchemy.pool.StaticPool)
+        elif (pool_size is None):
+            engine = sqlalchemy.create_engine(connection_string, connect_args = connect_args)
+        else:
+            engine = sqlalchemy.create_engine(connection_string, connect_args = connect_args, poolclass = sqlalchemy.pool.QueuePool, pool_size = pool_size, max_overflow = 0)
+
+        sqlalchemy.event.listen(engine, "connect", self.on_connect)
+
+        return engine
+
+
+    def on_connect(self, dbapi_connection, connection_record):
+
+        for name in ["STDDEV", "STDDEV_SAMP"]:
+            dbapi_connection.create_aggregate(name, 1, SqliteStddevSamp)
+        dbapi_connection.create_aggregate("STDDEV_POP", 1, SqliteStddevPop)
+        for name in ["VARIANCE", "VAR_SAMP"]:
+            dbapi_connection.create_aggregate(name, 1, SqliteVarianceSamp)
+        dbapi_connection.create_aggregate("VAR_POP", 1, SqliteVariancePop)
+
+        dbapi_connection.create_function("SQRT", 1, SqliteDialect.sqrt, deterministic = True)
+        dbapi_connection.create_function("POWER", 2, SqliteDialect.power, deterministic = True)
+        dbapi_connection.create_function("LN", 1, SqliteDialect.ln, deterministic = True)
+        dbapi_connection.create_function("EXP", 1, SqliteDialect.exp, deterministic = True)
+        dbapi_connection.create_function("MOD", 2, SqliteDialect.mod, deterministic = True)
+        dbapi_connection.create_function("GREATEST", -1, SqliteDialect.greatest, deterministic = True)
+        dbapi_connection.create_function("LEAST", -1, SqliteDialect.least, deterministic = True)
+        dbapi_connection.create_function("SP_RANDOM", 2, SqliteDialect.random, deterministic = True)
+        dbapi_connection.create_function("SP_HASH", 2, SqliteDialect.hash, deterministic = True)
+
+        with self.lock:
+            schemas = list(self.schemas.items())
+
+        for schema, path in schemas:
+            dbapi_connection.execute("ATTACH DATABASE '" + path.replace("'", "''") + "' AS " + schema)
+
+
+    def prepare_schema(self, dbconn, schema):
+
+        if (schema is None or schema.lower() in ("main", "temp")):
+            return
+
+        with self.lock:
+            if (schema.lower() in self.schemas):
+                return
+
+            if (self.database is None):
+                path = ":memory:"
+            else:
+                root, ext = os.path.splitext(self.database)
+                path = root + "_" + schema.lower() + (ext if (ext != "") else ".sqlite")
+
+            self.schemas[schema.lower()] = path
+
+        # new connections attach the schema on connect, the open connections of the calling thread are attached now
+        # in pooled mode the schemas should be prepared before the connections are checked out by other threads
+        if (dbconn.is_pooled() and getattr(dbconn.thread_local, "conn", None) is None):
+            return
+
+        dbconn.conn.exec_driver_sql("ATTACH DATABASE '" + path.replace("'", "''") + "' AS " + schema.lower())
+
+
+    def is_copy_supported(self, engine):
+        return False
+
+
+    def is_prepared_statement_supported(self, engine):
+        return False
+
+
+    def get_random_sql(self, random_state, key_column = None):
+        if (key_column is None):
+            return "random()"
+
+        return "SP_RANDOM(" + key_column + ", " + str(int(random_state)) + ")"
+
+
+    def get_seed_sql(self, random_state):
+        # the seed is the argument of SP_RANDOM
+        return ""
+
+
+    def get_hash_sql(self, column, random_state):
+        return "SP_HASH(" + column + ", " + str(int(random_state)) + ")"
+
+
+    def get_table_exists_sql(self, schema, table):
+        return "SELECT name FROM " + schema + ".sqlite_master WHERE type IN ('table', 'view') AND UPPER(name) = UPPER('" + table + "')"
+
+
+    def get_existing_views_sql(self, views):
+        # each schema is a separate database with its own sqlite_master
+        sqls = ["SELECT '" + schema + "', name FROM " + schema + ".sqlite_master WHERE type = 'view' AND UPPER(name) = UPPER('" + view + "')" for schema, view in views]
+        return "\nUNION ALL ".join(sqls)
+
+
+    def get_column_exists_sql(self, schema, table, column):
+        return "SELECT name FROM pragma_table_info('" + table + "', '" + schema + "') WHERE UPPER(name) = UPPER('" + column + "')"
+
+
+    def get_table_schema_sql(self, schema, table):
+        return "SELECT name AS column_name, type AS data_type, \"notnull\", dflt_value, pk FROM pragma_table_info('" + table + "', '" + schema + "') ORDER BY cid"
+
+
+    def get_add_identity_column_sql(self, schema, table, column):
+        # columns cannot be added with autoincrement, the rowid is copied instead
+        return ["ALTER TABLE " + schema + "." + table + " ADD COLUMN " + column + " INTEGER",
+            "UPDATE " + schema + "." + table + " SET " + column + " = rowid"]
+
+
+    def get_create_unique_index_sql(self, schema, table, column, index):
+        # the schema of an index is the schema of its table
+        return "CREATE UNIQUE INDEX " + schema + "." + index + " ON " + table + "(" + column + ")"
+
+
+    def get_add_primary_key_sql(self, schema, table, column, constraint):
+        # constraints cannot be added to an existing table, unique index is used instead
+        return self.get_create_unique_index_sql(schema, table, column, constraint)
+
+
+    def get_sample_sql(self, sdf, n, frac, random_state):
+
+        if (frac != 0):
+            limit = "(SELECT CAST(COUNT(*) * " + str(frac) + " AS INTEGER) FROM " + sdf.sdf_query_data_source + ")"
+        else:
+            limit = n
+
+        return sdf.generate_sql(limit = limit, order_by = self.get_random_sql(random_state, sdf.key_column))
+
+
+    def get_train_test_split_sql(self, sdf, test_size, random_state, test_table, train_table):
+
+        source = sdf.sdf_query_data_source
+        order_by = self.get_random_sql(random_state, sdf.key_column)
+        test_count = "(SELECT CAST(COUNT(*) * " + str(test_size) + " AS INTEGER) FROM " + source + ")"
+
+        sql = "SELECT * FROM " + source + "\nORDER BY " + order_by + " LIMIT " + test_count
+        test_sql = self.get_create_table_as_sql(sdf.fit_schema, test_table, sql)
+
+        sql = "SELECT * FROM " + source + "\nORDER BY " + order_by + " LIMIT -1 OFFSET " + test_count
+        train_sql = self.get_create_table_as_sql(sdf.fit_schema, train_table, sql)
+
+        return [(test_table, test_sql), (train_table, train_sql)]
+
+
+    def get_label_encoder_fit_sql(self, sdf, fit_table, column, options):
+
+        sql = "SELECT label_key, (ROW_NUMBER () OVER (ORDER BY label_key)) - 1 AS label_encoded"
+        sql += "\nFROM (SELECT DISTINCT " + column + " AS label_key FROM " + sdf.sdf_query_data_source + " AS data_table ) AS table_input"
+
+        return [self.get_create_table_as_sql(sdf.fit_schema, fit_table, sql),
+            self.get_add_primary_key_sql(sdf.fit_schema, fit_table, "label_key", fit_table.replace(".", "_") + "_key")]
+
+
+    def get_estimated_cost(self, dbconn, sql):
+        # EXPLAIN QUERY PLAN does not estimate the cost
+        return None
+
+
+    def get_approximate_row_count(self, dbconn, schema, table):
+        # sqlite_stat1 exists only after ANALYZE and the rows are counted quickly from the table b-tree
+        return None
+
+
+    def get_data_fingerprint(self, dbconn, schema, table):
+
+        row = dbconn.execute_query_onerow("SELECT COUNT(*) FROM " + schema + "." + table)
+        fingerprint = ["count", row[0] if (row is not None) else None]
+
+        # SQLite does not track modifications of tables, any committed write changes the database file
+        path = self.schemas.get(schema.lower(), self.database if (schema.lower() == "main") else None)
+        if (path is not None and path != ":memory:" and os.path.exists(path)):
+            stat = os.stat(path)
+            fingerprint += ["modification", (stat.st_mtime_ns, stat.st_size)]
+
+        return fingerprint
+
+
+    @classmethod
+    def sqrt(cls, value):
+        return math.sqrt(value) if (value is not None and value >= 0) else None
+
+
+    @classmethod
+    def power(cls, value, exponent):
+        if (value is None or exponent is None):
+            return None
+        try:
+            return math.pow(value, exponent)
+        except (ValueError, OverflowError):
+            return None
+
+
+    @classmethod
+    def ln(cls, value):
+        return math.log(value) if (value is not None and value > 0) else None
+
+
+    @classmethod
+    def mod(cls, value, divisor):
+        if (value is None or divisor is None or divisor == 0):
+            return None
+        # sign of the dividend as in SQL
+        return math.fmod(value, divisor) if (isinstance(value, float) or isinstance(divisor, float)) else int(math.copysign(abs(value) % abs(divisor), value))
+
+
+    @classmethod
+    def exp(cls, value):
+        if (value is None):
+            return None
+        try:
+            return math.exp(value)
+        except OverflowError:
+            return None
+
+
+    # GREATEST and LEAST ignore NULLs as in PostgreSQL
+    @classmethod
+    def greatest(cls, *values):
+        values = [value for value in values if (value is not None)]
+        return max(values) if (len(values) > 0) else None
+
+
+    @classmethod
+    def least(cls, *values):
+        values = [value for value in values if (value is not None)]
+        return min(values) if (len(values) > 0) else None
+
+
+    # uniformly distributed number in [0, 1) derived from the value and the seed
+    @classmethod
+    def random(cls, value, seed):
+        digest = hashlib.blake2b((repr(seed) + ":" + repr(value)).encode("utf-8"), digest_size = 8).digest()
+        return int.from_bytes(digest, "big") / 18446744073709551616.0
+
+
+    # same as SqlDialect.get_hash_sql
+    @classmethod
+    def hash(cls, value, seed):
+        if (value is None):
+            return None
+
+        digest = hashlib.md5((str(seed) + ":" + str(value)).encode("utf-8")).hexdigest()
+        return int(digest[:8], 16) / 4294967296.0
+
+# end of class SqliteDialect
+
+
+
+
+
+
+# Class: SqliteVarianceSamp
+# Aggregates registered by SqliteDialect, the variance is computed by Welford's algorithm
+class SqliteVarianceSamp:
+
+    # 1 for sample, 0 for population variance
+    ddof = 1
+
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+
+    def step(self, value):
+        if (value is None):
+            return
+
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+
+    def variance(self):
+        if (self.count - self.ddof <= 0):
+            return None
+
+        return self.m2 / (self.count - self.ddof)
+
+
+    def finalize(self):
+        return self.variance()
+
+
+
+class SqliteVariancePop(SqliteVarianceSamp):
+    ddof = 0
+
+
+
+class SqliteStddevSamp(SqliteVarianceSamp):
+
+    def finalize(self):
+        variance = self.variance()
+        return math.sqrt(variance) if (variance is not None) else None
+
+
+
+class SqliteStddevPop(SqliteStddevSamp):
+    ddof = 0
+
+# end of class SqliteVarianceSamp
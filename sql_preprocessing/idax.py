@@ -194,9 +194,11 @@ class IDAXNestedPipeline():
 
     # self.steps [name, transformer]
 
-    def __init__(self, steps, model):
+    # flatten - the steps are inlined into a single SELECT instead of nesting their SQL (see SqlDataFrame.clone_as_sql_source)
+    def __init__(self, steps, model, flatten = False):
         self.steps = steps
         self.model = model
+        self.flatten = flatten
 
 
     def __repr__(self):
@@ -235,7 +237,7 @@ class IDAXNestedPipeline():
             if (copy_sdf is None):
                 copy_sdf = sdf.clone()
             else: 
-                copy_sdf = copy_sdf.clone_as_sql_source()
+                copy_sdf = copy_sdf.clone_as_sql_source(flatten = self.flatten)
 
             function = step[1]
             function.fit(copy_sdf)
@@ -253,7 +255,7 @@ class IDAXNestedPipeline():
             if (copy_sdf is None):
                 copy_sdf = sdf.clone()
             else: 
-                copy_sdf = copy_sdf.clone_as_sql_source()
+                copy_sdf = copy_sdf.clone_as_sql_source(flatten = self.flatten)
 
             function = step[1]
             function.transform(copy_sdf)